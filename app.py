@@ -19,7 +19,6 @@ from time import sleep
 
 from src.app_api import log_handling, utils
 from src.app_api.device_mgmt import DeviceMgr
-from src.app_api.experiment_mgmt import Experiment, ExperimentManifest
 
 
 PROJECT_ROOT = utils.get_repo_root()
@@ -141,6 +140,10 @@ def experiment_run(args):
     """
     Runs an experiment.
     """
+    # experiment_mgmt pulls in torch and pandas through the node behavior modules, so it is only
+    # imported by the commands that actually run experiments
+    from src.app_api.experiment_mgmt import Experiment, ExperimentManifest
+
     exp_name = args.name
     logger.info(f"Attempting to set up experiment {exp_name}.")
     testcase_dir = PROJECT_ROOT / "MyData" / "TestCases"
@@ -1,11 +1,13 @@
 from plumbum.machines.session import ShellSessionError
 import rpyc
 import logging
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from rpyc.utils.zerodeploy import DeployedServer, TimeoutExpired
 from rpyc.core.stream import SocketStream
 from plumbum.machines.remote import RemoteCommand
-from plumbum import SshMachine, local, CommandNotFound
+from plumbum import SshMachine, local
 from plumbum.path import copy
 from plumbum.commands.base import BoundCommand
 
@@ -159,6 +161,22 @@ finally:
     close_server_finally()
 """
 
+# SERVER_SCRIPT is split around its $PLACEHOLDER$ markers once at import, so rendering it for a
+# node is a single join instead of one full-string replace pass per placeholder
+_PLACEHOLDER_RE = re.compile(r"\$([A-Z]+-[A-Z]+)\$")
+_SERVER_SCRIPT_PARTS = _PLACEHOLDER_RE.split(SERVER_SCRIPT)
+
+
+def render_server_script(values: dict[str, str]) -> str:
+    """
+    Returns SERVER_SCRIPT with each placeholder (e.g. "$NODE-NAME$") swapped for its value in the
+    given dict, which is keyed by the placeholder name without the dollar signs.
+    """
+    # re.split puts the captured placeholder names at the odd indices
+    return "".join(
+        values[part] if i % 2 else part for i, part in enumerate(_SERVER_SCRIPT_PARTS)
+    )
+
 
 class ZeroDeployedServer(DeployedServer):
 
@@ -181,67 +199,71 @@ class ZeroDeployedServer(DeployedServer):
         self._tmpdir_ctx = self.remote_machine.tempdir()
         tmp = self._tmpdir_ctx.__enter__()
 
-        # Copy over the rpyc and experiment_design packages
+        # Copy over the rpyc and experiment_design packages. Each upload is its own scp process,
+        # so they run in the background while the shell session writes the script and looks for
+        # a python executable below.
         rpyc_root = local.path(rpyc.__file__).up()
-        copy(rpyc_root, tmp / "rpyc")
-
         src_root = local.path(utils.get_repo_root() / "src")
-        copy(src_root, tmp / "src")
-
-        # Substitute placeholders in the remote script and send it over
-        script = (tmp / "deployed-rpyc.py")
-        modname, clsname = server_class.rsplit(".", 1)
-        m_module, m_class = model
-        ps_module, ps_class = participant_service
-        observer_ip = utils.get_local_ip()
-        participant_host = device.working_cparams.host
-        script.write(
-            SERVER_SCRIPT.replace(    # type: ignore
-                "$SVR-MODULE$", modname
-            ).replace(
-                "$SVR-CLASS$", clsname
-            ).replace(
-                "$MOD-MODULE$", m_module
-            ).replace(
-                "$MOD-CLASS$", m_class
-            ).replace(
-                "$PS-MODULE$", ps_module
-            ).replace(
-                "$PS-CLASS$", ps_class
-            ).replace(
-                "$NODE-NAME$", node_name
-            ).replace(
-                "$OBS-IP$", observer_ip
-            ).replace(
-                "$PRT-HOST$", participant_host
-            ).replace(
-                "$MAX-UPTIME$", str(timeout_s)
-            )
-        )
-        if isinstance(python_executable, BoundCommand):
-            cmd = python_executable
-        elif python_executable:
-            cmd = self.remote_machine[python_executable]
-        else:
-            major = sys.version_info[0]
-            minor = sys.version_info[1]
-            logger.info(
-                f"Observer uses Python {major}.{minor}. Looking for equivalent Python executable on {node_name}"
+        upload_pool = ThreadPoolExecutor(max_workers=2)
+        uploads = [
+            upload_pool.submit(copy, rpyc_root, tmp / "rpyc"),
+            upload_pool.submit(copy, src_root, tmp / "src"),
+        ]
+        upload_pool.shutdown(wait=False)
+
+        try:
+            # Substitute placeholders in the remote script and send it over
+            script = (tmp / "deployed-rpyc.py")
+            modname, clsname = server_class.rsplit(".", 1)
+            m_module, m_class = model
+            ps_module, ps_class = participant_service
+            observer_ip = utils.get_local_ip()
+            participant_host = device.working_cparams.host
+            script.write(
+                render_server_script({
+                    "SVR-MODULE": modname,
+                    "SVR-CLASS": clsname,
+                    "MOD-MODULE": m_module,
+                    "MOD-CLASS": m_class,
+                    "PS-MODULE": ps_module,
+                    "PS-CLASS": ps_class,
+                    "NODE-NAME": node_name,
+                    "OBS-IP": observer_ip,
+                    "PRT-HOST": participant_host,
+                    "MAX-UPTIME": str(timeout_s),
+                })
             )
-            cmd = None
-            for opt in [f"python{major}.{minor}", f"python{major}"]:
-                try:
-                    logger.info(f"Checking {opt}")
-                    cmd = self.remote_machine[opt]
-                    logger.info(f"{opt} is available.")
-                except CommandNotFound:
-                    logger.info(f"{opt} is not available.")
-                    pass
+            if isinstance(python_executable, BoundCommand):
+                cmd = python_executable
+            elif python_executable:
+                cmd = self.remote_machine[python_executable]
+            else:
+                major = sys.version_info[0]
+                minor = sys.version_info[1]
+                logger.info(
+                    f"Observer uses Python {major}.{minor}. Looking for equivalent Python executable on {node_name}"
+                )
+                # one shell round trip resolves the first available candidate, instead of a
+                # separate PATH walk (one remote stat per directory) for each option
+                cmd = None
+                candidates = [f"python{major}.{minor}", f"python{major}"]
+                probe = " || ".join(f"command -v {opt}" for opt in candidates)
+                _, found, _ = self.remote_machine._session.run(probe, retcode=None)
+                found = found.strip()
+                if found:
+                    logger.info(f"{found} is available.")
+                    cmd = self.remote_machine[found]
                 else:
-                    break
-            if not cmd:
-                logger.warning(f"Had to use the default python interpreter, which could cause problems.")
-                cmd = self.remote_machine.python
+                    logger.info(f"None of {candidates} are available.")
+                if not cmd:
+                    logger.warning(f"Had to use the default python interpreter, which could cause problems.")
+                    cmd = self.remote_machine.python
+        finally:
+            # always wait on the scp processes, even if the setup above raised; an upload error
+            # then surfaces on its own or chained onto the setup error
+            upload_errors = [e for e in (upload.exception() for upload in uploads) if e is not None]
+            if upload_errors:
+                raise upload_errors[0]
 
         assert isinstance(cmd, RemoteCommand)
         self.proc = cmd.popen(script, new_session=True)
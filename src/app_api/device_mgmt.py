@@ -1,14 +1,23 @@
+import copy
+import errno
+import functools
 import paramiko
+import selectors
 import socket
+import struct
 import ipaddress
+import os
 import pathlib
+import shlex
+import subprocess
+import time
 import yaml
 from plumbum import SshMachine
 from concurrent.futures import ThreadPoolExecutor
-from queue import Queue
-from typing import Union
+from typing import Iterator, Union
 
 from src.app_api import utils
+from src.app_api.utils import YamlDumper, YamlLoader
 
 
 class SSHAuthenticationException(Exception):
@@ -29,48 +38,172 @@ class DeviceUnavailableException(Exception):
         super().__init__(message)
 
 
+RESOLVE_TTL_S: int = 60
+
+
+def resolve_stream_address(host: str, port: int) -> tuple[tuple[int, int, int, tuple], ...]:
+    """
+    Returns every `(family, socktype, proto, sockaddr)` for a TCP connection to the host, in the
+    order getaddrinfo gives them. Results are cached for up to RESOLVE_TTL_S seconds, since the
+    same hosts are probed again every time devices are loaded or swept and a hostname lookup is a
+    blocking DNS round trip, but dynamic DNS names (e.g. duckdns) can move. Failed lookups raise
+    and are not cached.
+    """
+    return _resolve_stream_address(host, port, int(time.monotonic() // RESOLVE_TTL_S))
+
+
+@functools.lru_cache(maxsize=4096)
+def _resolve_stream_address(host: str, port: int, ttl_window: int) -> tuple[tuple[int, int, int, tuple], ...]:
+    # ttl_window only exists to make entries from an earlier window miss the cache
+    return tuple(
+        (family, socktype, proto, address)
+        for family, socktype, proto, _, address in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    )
+
+
 class LAN:
     """
     Helps with general networking tasks that are not specific to one host.
     """
     LOCAL_CIDR_BLOCK: list[str] = [str(ip)
         for ip in ipaddress.ip_network("192.168.1.0/24").hosts()]
+    NONBLOCK_FLAG: int = getattr(socket, "SOCK_NONBLOCK", 0)
+    LINGER_ABORT: bytes = struct.pack("ii", 1, 0)
 
     @classmethod
-    def host_is_reachable(cls, host: str, port: int, timeout: Union[int, float]) -> bool:
+    def _resolve(cls, host: str, port: int) -> tuple[tuple[int, int, int, tuple], ...]:
         """
-        Checks if the host is available at all, but does not attempt to authenticate.
+        Returns the host's resolved addresses, or an empty tuple if it can't be resolved.
         """
         try:
-            test_socket = socket.create_connection((host, port), timeout)
-            test_socket.close()
-            return True
+            return resolve_stream_address(host, port)
         except Exception:
-            return False
+            return ()
+
+    @classmethod
+    def _start_connect(cls, target: tuple[int, int, int, tuple]) -> Union[socket.socket, None]:
+        """
+        Starts a non-blocking connect to one resolved address, returning the socket (to be waited
+        on for writability) or None if the address refuses outright.
+        """
+        family, socktype, proto, address = target
+        try:
+            # on Linux the socket is created non-blocking in the same syscall
+            probe = socket.socket(family, socktype | cls.NONBLOCK_FLAG, proto)
+        except OSError:
+            return None
+        if not cls.NONBLOCK_FLAG:
+            probe.setblocking(False)
+        # abortive close (RST): a probe is dropped as soon as it connects, and a graceful close
+        # would leave one TIME_WAIT socket holding an ephemeral port per reachable host
+        probe.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, cls.LINGER_ABORT)
+        if probe.connect_ex(address) not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            probe.close()
+            return None
+        return probe
+
+    @classmethod
+    def host_is_reachable(cls, host: str, port: int, timeout: Union[int, float]) -> bool:
+        """
+        Checks if the host is available at all, but does not attempt to authenticate. The connect
+        is non-blocking and waited on with a selector, so a refused connection is reported as soon
+        as the RST arrives instead of tying up the caller until the timeout. Like
+        `socket.create_connection`, each resolved address is tried in turn (with its own timeout)
+        until one accepts, so a dual-stack name whose first record doesn't answer still counts.
+        """
+        for target in cls._resolve(host, port):
+            probe = cls._start_connect(target)
+            if probe is None:
+                continue
+            with probe, selectors.DefaultSelector() as selector:
+                selector.register(probe, selectors.EVENT_WRITE)
+                if selector.select(timeout) and probe.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                    return True
+        return False
+
+    @classmethod
+    def sweep(cls,
+        hosts: list[str],
+        port: int = 22,
+        timeout: Union[int, float] = 0.5,
+        max_inflight: int = 512) -> list[str]:
+        """
+        Single-threaded sweep for host lists too large for a thread pool (a /20 or a /16). Keeps
+        up to `max_inflight` non-blocking connects open on one selector, gives each one `timeout`
+        seconds, and returns the hosts that accepted in their original order. A host whose address
+        is refused or times out moves on to its next resolved address, as in `host_is_reachable`.
+        """
+        reachable = set()
+        pending = iter(hosts)
+        # every probe gets the same timeout, so insertion order is also deadline order
+        deadlines: dict[socket.socket, float] = {}
+
+        def launch(host: str, targets: Iterator[tuple[int, int, int, tuple]]) -> None:
+            for target in targets:
+                probe = cls._start_connect(target)
+                if probe is not None:
+                    selector.register(probe, selectors.EVENT_WRITE, (host, targets))
+                    deadlines[probe] = time.monotonic() + timeout
+                    return
+
+        def retire(probe: socket.socket) -> tuple[str, Iterator[tuple[int, int, int, tuple]]]:
+            host_and_targets = selector.unregister(probe).data
+            probe.close()
+            del deadlines[probe]
+            return host_and_targets
+
+        with selectors.DefaultSelector() as selector:
+            try:
+                exhausted = False
+                while not exhausted or deadlines:
+                    while not exhausted and len(deadlines) < max_inflight:
+                        host = next(pending, None)
+                        if host is None:
+                            exhausted = True
+                            break
+                        launch(host, iter(cls._resolve(host, port)))
+                    if not deadlines:
+                        continue
+
+                    wait = max(0.0, next(iter(deadlines.values())) - time.monotonic())
+                    for key, _ in selector.select(wait):
+                        probe = key.fileobj
+                        assert isinstance(probe, socket.socket)
+                        connected = probe.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0
+                        host, targets = retire(probe)
+                        if connected:
+                            reachable.add(host)
+                        else:
+                            launch(host, targets)
+
+                    now = time.monotonic()
+                    for probe in [p for p, deadline in deadlines.items() if deadline <= now]:
+                        launch(*retire(probe))
+            finally:
+                # an exception mid-sweep would otherwise leak every probe still in flight
+                for probe in deadlines:
+                    probe.close()
+
+        return [host for host in hosts if host in reachable]
 
     @classmethod
     def get_available_hosts(cls,
         try_hosts: list[str] = LOCAL_CIDR_BLOCK,
         port: int =22,
         timeout: Union[int, float] = 0.5,
-        max_threads: int = 50) -> list[str]:
+        max_threads: int = 256) -> list[str]:
         """
         Takes a list of strings (ip or hostname) and returns a new list containing only those that
-        are available, without attempting to authenticate. Uses threading.
+        are available, without attempting to authenticate. Uses threading, with one worker per
+        host up to `max_threads`, so a full sweep takes roughly one timeout. Lists longer than
+        `max_threads` are handed to the single-threaded `sweep` instead.
         """
-        available_hosts = Queue()
-
-        def check_host(host: str):
-            """
-            Adds host to queue if reachable.
-            """
-            if cls.host_is_reachable(host, port, timeout):
-                available_hosts.put(host)
-
-        with ThreadPoolExecutor(max_workers=max_threads) as executor:
-            executor.map(check_host, try_hosts)
-
-        return list(available_hosts.queue)
+        if len(try_hosts) > max_threads:
+            return cls.sweep(try_hosts, port=port, timeout=timeout)
+        n_workers = max(1, len(try_hosts))
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            reachable = executor.map(lambda host: cls.host_is_reachable(host, port, timeout), try_hosts)
+            return [host for host, is_up in zip(try_hosts, reachable) if is_up]
 
 
 class SSHConnectionParams:
@@ -81,6 +214,8 @@ class SSHConnectionParams:
     them between sessions) using this class.
     """
 
+    __slots__ = ("host", "user", "pkey", "pkey_fp", "_host_reachable", "_default")
+
     SSH_PORT: int = 22
     TIMEOUT_SECONDS: Union[int, float] = 0.5
 
@@ -90,6 +225,7 @@ class SSHConnectionParams:
     pkey_fp: pathlib.Path
 
     _host_reachable: bool  # set during constructor
+    _parsed_pkeys: dict[pathlib.Path, paramiko.RSAKey] = {}
 
     def __init__(self,
                  host: str,
@@ -145,7 +281,12 @@ class SSHConnectionParams:
         expanded_path = rsa_pkey_path.absolute().expanduser()
 
         if expanded_path.exists() and expanded_path.is_file():
-            self.pkey = paramiko.RSAKey(filename=str(expanded_path))
+            # devices usually share one key, so each file is only parsed once per process
+            pkey = self._parsed_pkeys.get(expanded_path)
+            if pkey is None:
+                pkey = paramiko.RSAKey(filename=str(expanded_path))
+                self._parsed_pkeys[expanded_path] = pkey
+            self.pkey = pkey
             self.pkey_fp = expanded_path
         else:
             raise ValueError(f"Invalid path '{rsa_pkey_path}' specified for RSA key.")
@@ -161,7 +302,7 @@ class SSHConnectionParams:
         """
         Returns the dictionary representation of the credentials. Used for persistent storage.
         """
-        return {"host": self.host, "user": self.user, "pkey_fp": self.pkey_fp}
+        return {"host": self.host, "user": self.user, "pkey_fp": str(self.pkey_fp), "default": self._default}
 
     def is_default(self) -> bool:
         """
@@ -175,6 +316,8 @@ class Device:
     A basic interface for keeping track of devices.
     """
 
+    __slots__ = ("_name", "_type", "_cparams", "working_cparams")
+
     _name: str
     _type: str
     _cparams: list[SSHConnectionParams]
@@ -184,7 +327,14 @@ class Device:
     def __init__(self, name: str, record: dict) -> None:
         self._name = name
         self._type = record["device_type"]
-        self._cparams = [SSHConnectionParams.from_dict(d) for d in record["connection_params"]] 
+        # each SSHConnectionParams probes its host on construction, so a device with several
+        # connection methods probes them all at once rather than waiting out each timeout in turn
+        records = record["connection_params"]
+        if len(records) > 1:
+            with ThreadPoolExecutor(max_workers=len(records)) as executor:
+                self._cparams = list(executor.map(SSHConnectionParams.from_dict, records))
+        else:
+            self._cparams = [SSHConnectionParams.from_dict(d) for d in records]
         
         # check the default method first
         self._cparams.sort(key=lambda x: 1 if x.is_default() else 0, reverse=True)
@@ -241,9 +391,13 @@ class DeviceMgr:
 
     DATAFILE_PATH: pathlib.Path = utils.get_repo_root() / "src" / "app_api" / "AppData" / "known_devices.yaml"
 
-    devices: list[Device]
+    MAX_LOAD_WORKERS: int = 8
+
+    devices: dict[str, Device]  # keyed by device name
     datafile_path: pathlib.Path
 
+    _parsed_datafiles: dict[pathlib.Path, tuple[int, dict]] = {}
+
     def __init__(self, dfile_path: Union[pathlib.Path, None] = None) -> None:
         if dfile_path is None:
             self.datafile_path = self.DATAFILE_PATH
@@ -253,18 +407,55 @@ class DeviceMgr:
 
     def get_devices(self, available_only: bool = False) -> list[Device]:
         if available_only:
-            return [d for d in self.devices if d.is_reachable()]
-        return self.devices
+            return [d for d in self.devices.values() if d.is_reachable()]
+        return list(self.devices.values())
+
+    def get_device(self, name: str) -> Union[Device, None]:
+        """
+        Returns the device with the given name, or None if there is no such device.
+        """
+        return self.devices.get(name)
 
     def _load(self) -> None:
-        with open(self.datafile_path, 'r') as file:
-            data = yaml.load(file, Loader=yaml.SafeLoader)
-        self.devices = [Device(dname, drecord) for dname, drecord in data.items()]
+        """
+        Builds a Device for each record in the datafile. Each Device probes its hosts while it is
+        constructed, so the records are loaded on a bounded thread pool rather than one by one.
+        """
+        data = self._read_datafile()
+        with ThreadPoolExecutor(max_workers=self.MAX_LOAD_WORKERS) as executor:
+            self.devices = {
+                d._name: d for d in executor.map(lambda item: Device(*item), data.items())
+            }
+
+    def _read_datafile(self) -> dict:
+        """
+        Returns the parsed contents of the datafile, reusing the previous parse for as long as the
+        file's mtime stays the same. Callers get their own copy, so mutating a record can't leak
+        into the cache shared by every DeviceMgr.
+        """
+        mtime = self.datafile_path.stat().st_mtime_ns
+        cached = self._parsed_datafiles.get(self.datafile_path)
+        if cached is None or cached[0] != mtime:
+            with open(self.datafile_path, 'r') as file:
+                data = yaml.load(file, Loader=YamlLoader)
+            cached = (mtime, data)
+            self._parsed_datafiles[self.datafile_path] = cached
+        return copy.deepcopy(cached[1])
 
     def _save(self) -> None:
-        serialized_devices = {name: details for name, details in [d.serialized() for d in self.devices]}
+        """
+        Writes the devices back to the datafile, skipping the write altogether when the contents
+        would not change. A missing datafile is simply created.
+        """
+        serialized_devices = {name: details for name, details in [d.serialized() for d in self.devices.values()]}
+        try:
+            unchanged = serialized_devices == self._read_datafile()
+        except FileNotFoundError:
+            unchanged = False
+        if unchanged:
+            return
         with open(self.datafile_path, 'w') as file:
-            yaml.dump(serialized_devices, file)
+            yaml.dump(serialized_devices, file, Dumper=YamlDumper, default_flow_style=False, sort_keys=False)
 
 
 class SSHSession(paramiko.SSHClient):
@@ -275,6 +466,10 @@ class SSHSession(paramiko.SSHClient):
     has already been validated as available (listening on port 22).
     """
 
+    TAR_CHUNK_BYTES: int = 64 * 1024
+    KEEPALIVE_INTERVAL_S: int = 15
+    HOST_KEY_POLICY: paramiko.MissingHostKeyPolicy = paramiko.AutoAddPolicy()
+
     login_params: SSHConnectionParams
     host: str  # IP address or hostname
 
@@ -308,7 +503,7 @@ class SSHSession(paramiko.SSHClient):
         user = self.login_params.user
         pkey = self.login_params.pkey
 
-        self.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self.set_missing_host_key_policy(self.HOST_KEY_POLICY)
 
         self.connect(
             self.host,
@@ -318,33 +513,111 @@ class SSHSession(paramiko.SSHClient):
             timeout=1
         )
 
+        # a dead link surfaces on the transport by itself, so callers never need an echo probe
+        transport = self.get_transport()
+        assert transport is not None
+        transport.set_keepalive(self.KEEPALIVE_INTERVAL_S)
+
     def copy_over(self, from_path: pathlib.Path, to_path: pathlib.Path, exclude: list = []):
         """
-        Copy a file or directory over to the remote device.
+        Copy a file or directory over to the remote device. For directories, the whole remote tree
+        is created with one `mkdir -p` call before any files are uploaded. Anything named in
+        `exclude` is skipped at every level. Uploads skip paramiko's post-write `stat`
+        confirmation, which would otherwise cost one extra round trip per file.
         """
+        if from_path.name in exclude:
+            return
         sftp = self.open_sftp()
-        if not from_path.name in exclude:
-            if from_path.is_dir():
-                try:
-                    sftp.stat(str(to_path))
-                except FileNotFoundError:
-                    sftp.mkdir(str(to_path))
-
-                for item in from_path.iterdir():
-                    # Recursive call to handle subdirectories and files
-                    self.copy_over(item, to_path / item.name)
-            else:
-                # Upload the file
-                sftp.put(str(from_path), str(to_path))
+        if from_path.is_dir():
+            remote_dirs, uploads = [], []
+            for dirpath, dirnames, filenames in os.walk(from_path, followlinks=True):
+                dirnames[:] = [d for d in dirnames if d not in exclude]
+                remote_dir = to_path / pathlib.Path(dirpath).relative_to(from_path)
+                remote_dirs.append(remote_dir)
+                uploads.extend(
+                    (pathlib.Path(dirpath) / fn, remote_dir / fn) for fn in filenames if fn not in exclude
+                )
+            # mkdir -p is idempotent, so there's no need to check which directories exist first
+            self.run_command("mkdir -p " + " ".join(shlex.quote(str(d)) for d in remote_dirs))
+            for local_fp, remote_fp in uploads:
+                sftp.put(str(local_fp), str(remote_fp), confirm=False)
+        else:
+            # Upload the file
+            sftp.put(str(from_path), str(to_path), confirm=False)
         sftp.close()
 
-    def mkdir(self, to_path: pathlib.Path, perms: int = 511):
-        sftp = self.open_sftp()
+    def copy_over_tar(self, from_path: pathlib.Path, to_path: pathlib.Path, exclude: list = []):
+        """
+        Copy the contents of a directory over to the remote device as a single tar stream. Every
+        file sent with `copy_over` costs its own SFTP round trips, whereas this pipes the whole
+        tree through one channel into `tar` on the remote end, which also preserves permissions.
+        Unlike `copy_over`, symlinks are sent as links rather than followed. Single files are
+        handed off to `copy_over`.
+        """
+        if from_path.name in exclude:
+            return
+        if not from_path.is_dir():
+            self.copy_over(from_path, to_path, exclude=exclude)
+            return
+
+        transport = self.get_transport()
+        assert transport is not None
+        channel = transport.open_session()
+
+        def remote_stderr() -> str:
+            return channel.makefile_stderr("rb").read().decode().strip()
+
         try:
-            sftp.mkdir(str(to_path), perms)
-        except IOError:
-            print(f"directory {to_path} already exists on remote device")
-        sftp.close()
+            remote_dir = shlex.quote(str(to_path))
+            channel.exec_command(f"mkdir -p {remote_dir} && tar xpf - -C {remote_dir}")
+
+            tar_cmd = ["tar", "cf", "-", *[f"--exclude={name}" for name in exclude], "-C", str(from_path), "."]
+            with subprocess.Popen(tar_cmd, stdout=subprocess.PIPE) as tar_proc:
+                assert tar_proc.stdout is not None
+                try:
+                    while chunk := tar_proc.stdout.read(self.TAR_CHUNK_BYTES):
+                        channel.sendall(chunk)
+                except Exception as e:
+                    # sendall only fails once the channel is closed, so stderr can be read in full
+                    tar_proc.kill()
+                    raise IOError(f"failed sending {from_path} to {self.host}: {remote_stderr()}") from e
+            channel.shutdown_write()
+
+            if tar_proc.returncode:
+                raise IOError(f"local tar exited with status {tar_proc.returncode} while packing {from_path}")
+            if channel.recv_exit_status():
+                raise IOError(f"remote tar failed to unpack into {to_path} on {self.host}: {remote_stderr()}")
+        finally:
+            channel.close()
+
+    def run_command(self, command: str) -> str:
+        """
+        Runs a command on the remote device over a single channel and returns its stdout, raising
+        an IOError with the contents of stderr if the command exits with a nonzero status.
+        """
+        _, stdout, stderr = self.exec_command(command)
+        output = stdout.read().decode()
+        if stdout.channel.recv_exit_status():
+            raise IOError(f"'{command}' failed on {self.host}: {stderr.read().decode().strip()}")
+        return output
+
+    def mkdir(self, to_path: pathlib.Path, perms: Union[int, None] = None, use_sftp: bool = False):
+        """
+        Creates the directory (and any missing parents) on the remote device with a single
+        `mkdir -p` call, honoring the remote umask unless explicit `perms` are given. Explicit
+        perms only apply to the leaf directory. Set `use_sftp` for hosts where the `mkdir` command
+        is unavailable.
+        """
+        if use_sftp:
+            sftp = self.open_sftp()
+            try:
+                sftp.mkdir(str(to_path), 511 if perms is None else perms)
+            except IOError:
+                print(f"directory {to_path} already exists on remote device")
+            sftp.close()
+            return
+        mode = "" if perms is None else f"-m {perms:o} "
+        self.run_command(f"mkdir -p {mode}{shlex.quote(str(to_path))}")
 
     def rpc_container_up(self):
         pass
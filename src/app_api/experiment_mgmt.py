@@ -7,6 +7,7 @@ import yaml
 import rpyc
 import rpyc.core.protocol
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from rpyc.utils.server import ThreadedServer
 from rpyc.utils.registry import UDPRegistryServer
 from rpyc.utils.classic import obtain
@@ -16,6 +17,7 @@ from datetime import datetime
 
 import src.experiment_design.tasks.tasks as tasks
 import src.app_api.utils as utils
+from src.app_api.utils import YamlLoader
 import src.app_api.device_mgmt as dm
 from src.app_api.deploy import ZeroDeployedServer
 from src.experiment_design.node_behavior.base import ObserverService
@@ -57,7 +59,7 @@ class ExperimentManifest:
         `(participant_types, participant_instances, playbook)`
         """
         with open(manifest_fp, 'r') as file:
-            manifest_dict = yaml.load(file, yaml.Loader)
+            manifest_dict = yaml.load(file, Loader=YamlLoader)
         participant_types = manifest_dict["participant_types"]
         participant_instances = manifest_dict["participant_instances"]
         playbook = manifest_dict["playbook"]
@@ -103,27 +105,30 @@ class ExperimentManifest:
             self, available_devices: list[dm.Device]
         ) -> list[tuple[dm.Device, str, tuple[str, str], tuple[str, str]]]:
         result = []
+        unclaimed = {d._name: d for d in available_devices}
         # instances where device is "any" go last since they don't care
         for instance in sorted(self.participant_instances, key=lambda x: 1 if x["device"] == "any" else 0):
             device = instance["device"]
-            for d in available_devices:
-                if d._name == device or device.lower() == "any":
-                    node_name = instance["instance_name"]
-                    model_specs = self.participant_types[instance["node_type"]]["model"]
-                    model = tuple([model_specs["module"], model_specs["class"]])
-                    if "default" in model:
-                        model = tuple(["", ""])
-                    service_specs = self.participant_types[instance["node_type"]]["service"]
-                    service = tuple([service_specs["module"], service_specs["class"]])
-                    param_tuple = tuple([d, node_name, model, service])
-                    result.append(param_tuple)
-                    available_devices.remove(d)
-                    break
+            if device.lower() == "any":
+                d = next(iter(unclaimed.values()), None)
             else:
+                d = unclaimed.get(device)
+            if d is None:
                 raise dm.DeviceUnavailableException(
                     f"Experiment manifest specifies device {device} for" +
                     f" {instance['instance_name']}, but it is unavailable."
                 )
+            node_name = instance["instance_name"]
+            model_specs = self.participant_types[instance["node_type"]]["model"]
+            model = tuple([model_specs["module"], model_specs["class"]])
+            if "default" in model:
+                model = tuple(["", ""])
+            service_specs = self.participant_types[instance["node_type"]]["service"]
+            service = tuple([service_specs["module"], service_specs["class"]])
+            param_tuple = tuple([d, node_name, model, service])
+            result.append(param_tuple)
+            del unclaimed[d._name]
+            available_devices.remove(d)
         return result
 
 
@@ -134,7 +139,7 @@ class Experiment:
 
     available_devices: list[dm.Device]
     manifest: ExperimentManifest
-    registry_server: UDPRegistryServer = UDPRegistryServer(allow_listing=True)
+    registry_server: UDPRegistryServer
     observer_node: ThreadedServer
     observer_conn: ObserverService
     participant_nodes: list[ZeroDeployedServer] = []
@@ -145,6 +150,9 @@ class Experiment:
     def __init__(self, manifest: ExperimentManifest, available_devices: list[dm.Device]):
         self.available_devices = available_devices
         self.manifest = manifest
+        # built here rather than in the class body, which bound its UDP socket at import time for
+        # every command, including the ones that never run an experiment
+        self.registry_server = UDPRegistryServer(allow_listing=True)
         self.threads = {
             "registry_svr": threading.Thread(target=self.start_registry, daemon=True),
             "observer_svr": threading.Thread(target=self.start_observer_node, daemon=True),
@@ -224,9 +232,24 @@ class Experiment:
         raise TimeoutError(f"observer took too long to become available")
 
     def start_participant_nodes(self) -> None:
+        """
+        Deploys all participant nodes at once. Each deployment has its own SSH connection, so the
+        handshakes and uploads for different devices overlap instead of running back to back. If
+        any deployment fails, the ones that succeeded are closed before the first error is raised.
+        """
         zdeploy_node_param_list = self.manifest.get_zdeploy_params(self.available_devices)
-        for params in zdeploy_node_param_list:
-            self.participant_nodes.append(ZeroDeployedServer(*params))
+        with ThreadPoolExecutor(max_workers=max(1, len(zdeploy_node_param_list))) as executor:
+            futures = [executor.submit(ZeroDeployedServer, *params) for params in zdeploy_node_param_list]
+        deployed = [f.result() for f in futures if f.exception() is None]
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if errors:
+            for node in deployed:
+                try:
+                    node.close()
+                except Exception:
+                    logger.warning(f"failed to close {node.name} after an aborted deployment")
+            raise errors[0]
+        self.participant_nodes.extend(deployed)
 
     def verify_all_nodes_up(self):
         logger.info("verifying required nodes are up.")
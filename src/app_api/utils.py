@@ -1,10 +1,18 @@
 import socket
 from contextlib import closing
+from functools import lru_cache
 from pathlib import Path
 from rpyc.core import brine
 from rpyc.utils.registry import REGISTRY_PORT, MAX_DGRAM_SIZE
 
 
+# libyaml's C parser/emitter when PyYAML was built with it, pure Python otherwise
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
+
+
 REMOTE_LOG_SVR_PORT = 9000
 
 
@@ -15,10 +23,12 @@ def get_repo_root() -> Path:
     return Path(__file__).parent.parent.parent.absolute()
 
 
+@lru_cache(maxsize=1)
 def get_local_ip():
     """
     Returns the ip address currently used by the local machine. To automatically find the most
-    appropriate network interface, we use the Google DNS server trick.
+    appropriate network interface, we use the Google DNS server trick. The answer is cached, since
+    every node deployment asks for it.
     """
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try: